@@ -0,0 +1,10 @@
+import pandas as pd
+
+# =============================================
+# ONE-OFF CSV -> PARQUET CONVERSION
+# =============================================
+# Run once after the notebook has produced gtd_cleaned.csv:
+#     python convert_to_parquet.py
+df = pd.read_csv('gtd_cleaned.csv')
+df.to_parquet('gtd_cleaned.parquet', compression='zstd', engine='pyarrow', index=False)
+print(f"Wrote gtd_cleaned.parquet ({len(df):,} rows, {len(df.columns)} columns)")
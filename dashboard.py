@@ -1,9 +1,15 @@
+import functools
+import io
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pycountry
 
 # =============================================
 # PAGE CONFIGURATION
@@ -51,21 +57,21 @@ st.markdown("""
 
     [data-testid="stMetricLabel"] { color: #e2e8f0 !important; }
 
-    .stTabs [data-baseweb="tab-list"] {
+    .st-key-active_tab [role="radiogroup"] {
         gap: 8px;
         background-color: #1e293b;
         border-radius: 10px;
         padding: 10px;
     }
 
-    .stTabs [data-baseweb="tab"] {
+    .st-key-active_tab [role="radiogroup"] label {
         background-color: #334155;
         border-radius: 8px;
         color: #e2e8f0;
         padding: 10px 20px;
     }
 
-    .stTabs [aria-selected="true"] {
+    .st-key-active_tab [role="radiogroup"] label:has(input:checked) {
         background: linear-gradient(135deg, #3b82f6 0%, #60a5fa 100%) !important;
     }
 
@@ -115,11 +121,47 @@ st.markdown("""
 # =============================================
 # DATA LOADING
 # =============================================
+NEEDED_COLS = ['year', 'month', 'region', 'country', 'city', 'attack_type', 'target_type',
+               'group_name', 'nkill', 'nwound', 'success', 'latitude', 'longitude']
+CATEGORY_COLS = ['region', 'country', 'city', 'attack_type', 'target_type', 'group_name']
+
+# GTD spellings that pycountry.countries.lookup() does not resolve. Historical states with a
+# direct successor are mapped to it (Zaire, Rhodesia, ...); states that later split or merged
+# (Soviet Union, Yugoslavia, West Germany, ...) are left unmapped.
+ISO3_OVERRIDES = {
+    'Bosnia-Herzegovina': 'BIH', 'Brunei': 'BRN', 'Democratic Republic of the Congo': 'COD',
+    'East Timor': 'TLS', 'Falkland Islands': 'FLK', 'Ivory Coast': 'CIV', 'Macau': 'MAC',
+    'Macedonia': 'MKD', "People's Republic of the Congo": 'COG', 'Rhodesia': 'ZWE',
+    'Russia': 'RUS', 'St. Kitts and Nevis': 'KNA', 'St. Lucia': 'LCA', 'Swaziland': 'SWZ',
+    'Turkey': 'TUR', 'Vatican City': 'VAT', 'West Bank and Gaza Strip': 'PSE', 'Zaire': 'COD',
+}
+
+def country_to_iso3(name):
+    if name in ISO3_OVERRIDES:
+        return ISO3_OVERRIDES[name]
+    try:
+        return pycountry.countries.lookup(name).alpha_3
+    except LookupError:
+        return None
+
 @st.cache_data
 def load_data():
-    df = pd.read_csv('gtd_cleaned.csv')
+    df = pd.read_parquet('gtd_cleaned.parquet', columns=NEEDED_COLS, engine='pyarrow')
+    for c in CATEGORY_COLS:
+        df[c] = df[c].astype('category')
+    df['nkill'] = df['nkill'].fillna(0).astype('int32')
+    df['nwound'] = df['nwound'].fillna(0).astype('int32')
+    df['success'] = df['success'].astype('int8')
+    df['year'] = df['year'].astype('int16')
+    df['month'] = df['month'].astype('int8')
+    df['latitude'] = df['latitude'].astype('float32')
+    df['longitude'] = df['longitude'].astype('float32')
     return df
 
+@st.cache_data
+def iso3_lookup(_df):
+    return {c: country_to_iso3(c) for c in _df['country'].cat.categories}
+
 with st.spinner(' Loading Global Terrorism Database...'):
     df = load_data()
 
@@ -166,218 +208,286 @@ with st.sidebar:
 # =============================================
 # APPLY FILTERS
 # =============================================
-df_filtered = df[(df['year'] >= year_range[0]) & (df['year'] <= year_range[1])].copy()
+def category_code(series, value):
+    return series.cat.categories.get_loc(value)
+
+@st.cache_data(max_entries=32)
+def apply_filters(_df, year_range, region, country, attack, success):
+    years = _df['year'].values
+    mask = (years >= year_range[0]) & (years <= year_range[1])
+    if region != 'All Regions':
+        mask &= _df['region'].cat.codes.values == category_code(_df['region'], region)
+    if country != 'All Countries':
+        mask &= _df['country'].cat.codes.values == category_code(_df['country'], country)
+    if attack != 'All Types':
+        mask &= _df['attack_type'].cat.codes.values == category_code(_df['attack_type'], attack)
+    if success == "Successful":
+        mask &= _df['success'].values == 1
+    elif success == "Failed":
+        mask &= _df['success'].values == 0
+    return _df.iloc[np.flatnonzero(mask)]
+
+df_filtered = apply_filters(df, year_range, selected_region, selected_country, selected_attack, success_filter)
 
-if selected_region != 'All Regions':
-    df_filtered = df_filtered[df_filtered['region'] == selected_region]
-if selected_country != 'All Countries':
-    df_filtered = df_filtered[df_filtered['country'] == selected_country]
-if selected_attack != 'All Types':
-    df_filtered = df_filtered[df_filtered['attack_type'] == selected_attack]
-if success_filter == "Successful":
-    df_filtered = df_filtered[df_filtered['success'] == 1]
-elif success_filter == "Failed":
-    df_filtered = df_filtered[df_filtered['success'] == 0]
+# =============================================
+# PRECOMPUTED AGGREGATES
+# =============================================
+CUBE_DIMS = ['year', 'region', 'country', 'attack_type', 'success']
+
+@st.cache_data
+def yearly_cube(_df):
+    return _df.groupby(CUBE_DIMS, observed=True).agg(
+        killed=('nkill', 'sum'), wounded=('nwound', 'sum'),
+        attacks=('nkill', 'size'), successes=('success', 'sum')
+    ).astype('int32')
+
+def yearly_totals(cube, year_range, region, country, attack, success):
+    years = cube.index.get_level_values('year')
+    mask = (years >= year_range[0]) & (years <= year_range[1])
+    if region != 'All Regions':
+        mask &= cube.index.get_level_values('region') == region
+    if country != 'All Countries':
+        mask &= cube.index.get_level_values('country') == country
+    if attack != 'All Types':
+        mask &= cube.index.get_level_values('attack_type') == attack
+    if success == "Successful":
+        mask &= cube.index.get_level_values('success') == 1
+    elif success == "Failed":
+        mask &= cube.index.get_level_values('success') == 0
+    yearly = cube[mask].groupby(level='year').sum()
+    yearly['success_rate'] = yearly['successes'] / yearly['attacks']
+    return yearly[['killed', 'wounded', 'attacks', 'success_rate']].reset_index()
+
+def top_n(df, col, n):
+    # Keep every row tied with the nth largest so the stable sort breaks ties like nlargest.
+    if len(df) > n:
+        values = df[col].values
+        cutoff = values[np.argpartition(-values, n - 1)[n - 1]]
+        df = df[values >= cutoff]
+    return df.sort_values(col, ascending=False, kind='stable').head(n)
 
 # =============================================
 # KPI METRICS
 # =============================================
 st.markdown("###  Key Metrics")
+n_attacks = len(df_filtered)
+total_killed, total_wounded, total_success = np.array([
+    df_filtered['nkill'].values.sum(), df_filtered['nwound'].values.sum(), df_filtered['success'].values.sum()
+], dtype=np.float64)
+success_rate = total_success / n_attacks * 100 if n_attacks else 0.0
+
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    st.metric(" Total Attacks", f"{len(df_filtered):,}")
+    st.metric(" Total Attacks", f"{n_attacks:,}")
 with col2:
-    st.metric(" Total Killed", f"{df_filtered['nkill'].sum():,.0f}")
+    st.metric(" Total Killed", f"{total_killed:,.0f}")
 with col3:
-    st.metric(" Total Wounded", f"{df_filtered['nwound'].sum():,.0f}")
+    st.metric(" Total Wounded", f"{total_wounded:,.0f}")
 with col4:
-    total_cas = df_filtered['nkill'].sum() + df_filtered['nwound'].sum()
-    st.metric(" Total Casualties", f"{total_cas:,.0f}")
+    st.metric(" Total Casualties", f"{total_killed + total_wounded:,.0f}")
 with col5:
-    success_rate = df_filtered['success'].mean() * 100
     st.metric(" Success Rate", f"{success_rate:.1f}%")
 
 st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
 
+# =============================================
+# CACHED FIGURES
+# =============================================
+@st.cache_data(max_entries=32)
+def attacks_trend_figure(yearly):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=yearly['year'], y=yearly['attacks'],
+        fill='tozeroy', mode='lines', name='Attacks',
+        line=dict(color='#3b82f6', width=3),
+        fillcolor='rgba(59, 130, 246, 0.3)'
+    ))
+    fig.update_layout(
+        title='Attacks Over Time',
+        template='plotly_dark',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        hovermode='x unified'
+    )
+    return fig
+
+@st.cache_data(max_entries=32)
+def casualties_trend_figure(yearly):
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(x=yearly['year'], y=yearly['killed'], name='Killed', marker_color='#3b82f6'), secondary_y=False)
+    fig.add_trace(go.Scatter(x=yearly['year'], y=yearly['wounded'], name='Wounded', line=dict(color='#22c55e', width=3)), secondary_y=True)
+    fig.update_layout(
+        title='Casualties Over Time',
+        template='plotly_dark',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        legend=dict(orientation="h", y=1.1)
+    )
+    return fig
+
 # =============================================
 # MAIN TABS
 # =============================================
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    " Trends", " Map", " Attacks", " Groups", " Insights", " Data"
-])
+# Only the selected view is rendered; the others cost nothing on a rerun.
+TAB_NAMES = [" Trends", " Map", " Attacks", " Groups", " Insights", " Data"]
+active_tab = st.radio("View", TAB_NAMES, horizontal=True, key='active_tab', label_visibility='collapsed')
 
 # =============================================
 # TAB 1: TRENDS
 # =============================================
-with tab1:
-    yearly = df_filtered.groupby('year').agg({
-        'nkill': 'sum', 'nwound': 'sum', 'country': 'count', 'success': 'mean'
-    }).reset_index()
-    yearly.columns = ['year', 'killed', 'wounded', 'attacks', 'success_rate']
+@st.fragment
+def render_trends(df_filtered):
+    yearly = yearly_totals(yearly_cube(df), year_range, selected_region, selected_country,
+                           selected_attack, success_filter)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=yearly['year'], y=yearly['attacks'],
-            fill='tozeroy', mode='lines', name='Attacks',
-            line=dict(color='#3b82f6', width=3),
-            fillcolor='rgba(59, 130, 246, 0.3)'
-        ))
-        fig.update_layout(
-            title='Attacks Over Time',
-            template='plotly_dark',
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            hovermode='x unified'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = attacks_trend_figure(yearly)
+        st.plotly_chart(fig, use_container_width=True, key='trend_attacks')
 
     with col2:
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        fig.add_trace(go.Bar(x=yearly['year'], y=yearly['killed'], name='Killed', marker_color='#3b82f6'), secondary_y=False)
-        fig.add_trace(go.Scatter(x=yearly['year'], y=yearly['wounded'], name='Wounded', line=dict(color='#22c55e', width=3)), secondary_y=True)
-        fig.update_layout(
-            title='Casualties Over Time',
-            template='plotly_dark',
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            legend=dict(orientation="h", y=1.1)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = casualties_trend_figure(yearly)
+        st.plotly_chart(fig, use_container_width=True, key='trend_casualties')
     
     if selected_region == 'All Regions':
-        region_yearly = df_filtered.groupby(['year', 'region']).size().reset_index(name='attacks')
+        region_yearly = df_filtered.groupby(['year', 'region'], observed=True).size().reset_index(name='attacks')
         fig = px.area(region_yearly, x='year', y='attacks', color='region',
                       title='Attacks by Region Over Time',
                       color_discrete_sequence=px.colors.qualitative.Safe)
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='trend_regions')
 
     col1, col2 = st.columns(2)
     with col1:
         monthly = df_filtered.groupby('month').size().reset_index(name='attacks')
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        month_names = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
         monthly = monthly[monthly['month'].between(1, 12)]
-        monthly['month_name'] = monthly['month'].apply(lambda x: month_names[int(x)-1])
+        monthly['month_name'] = month_names[monthly['month'].to_numpy() - 1]
 
         fig = go.Figure(go.Barpolar(r=monthly['attacks'], theta=monthly['month_name'],
                                      marker_color=monthly['attacks'], marker_colorscale='Blues'))
         fig.update_layout(title='Monthly Pattern', template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='trend_monthly')
 
     with col2:
-        df_filtered['decade'] = (df_filtered['year'] // 10 * 10).astype(str) + 's'
-        decade_stats = df_filtered.groupby('decade').size().reset_index(name='attacks')
+        decades = (df_filtered['year'].values // 10 * 10).astype(np.int16)
+        decade_stats = pd.Series(decades).value_counts().sort_index().rename_axis('decade').reset_index(name='attacks')
+        decade_stats['decade'] = decade_stats['decade'].astype(str) + 's'
         fig = px.bar(decade_stats, x='decade', y='attacks', color='attacks',
                      title='Attacks by Decade', color_continuous_scale='Blues')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='trend_decades')
 
 # =============================================
 # TAB 2: MAP
 # =============================================
-with tab2:
-    map_data = df_filtered[df_filtered['latitude'].notna() & df_filtered['longitude'].notna()].copy()
-    
-    if len(map_data) > 5000:
-        map_data = map_data.sample(n=5000, random_state=42)
-        st.info(" Showing 5,000 sample points for performance")
-    
+MAP_BIN_DEG = 0.5
+
+@st.fragment
+def render_map(df_filtered):
+    # Rows without coordinates get NaN bins, which groupby drops, so no masked copy is needed.
+    lat_bins = np.round(df_filtered['latitude'].values / MAP_BIN_DEG) * MAP_BIN_DEG
+    lon_bins = np.round(df_filtered['longitude'].values / MAP_BIN_DEG) * MAP_BIN_DEG
+    map_data = df_filtered.groupby([lat_bins, lon_bins]).agg(
+        nkill=('nkill', 'sum'), attacks=('nkill', 'size'),
+        attack_type=('attack_type', 'first'), country=('country', 'first')
+    ).rename_axis(['latitude', 'longitude']).reset_index()
+
     if len(map_data) > 0:
-        map_data['size'] = map_data['nkill'].fillna(1).clip(lower=1, upper=100)
+        st.info(f" Showing {len(map_data):,} locations aggregated on a {MAP_BIN_DEG}° grid")
 
-        fig = px.scatter_geo(
+        map_data['size'] = np.clip(map_data['nkill'].to_numpy(dtype=np.float32), 1, 100)
+
+        fig = px.scatter_map(
             map_data, lat='latitude', lon='longitude',
             color='attack_type', size='size',
-            hover_name='city',
-            hover_data={'country': True, 'year': True, 'nkill': True, 'latitude': False, 'longitude': False},
-            title='Global Attack Locations',
+            hover_name='country',
+            hover_data={'attacks': True, 'nkill': True, 'size': False, 'latitude': False, 'longitude': False},
+            title='Global Attack Locations', zoom=1, map_style='carto-darkmatter',
             color_discrete_sequence=px.colors.qualitative.Safe
         )
         fig.update_layout(
             template='plotly_dark',
             paper_bgcolor='rgba(0,0,0,0)',
-            geo=dict(showframe=False, projection_type='natural earth', bgcolor='rgba(0,0,0,0)', landcolor='#1e293b'),
             height=600
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='map_locations')
 
-    country_counts = df_filtered['country'].value_counts().reset_index()
-    country_counts.columns = ['country', 'attacks']
+    country_counts = df_filtered.groupby('country', observed=True).size().reset_index(name='attacks')
+    country_counts['iso3'] = country_counts['country'].astype(str).map(iso3_lookup(df))
+    country_counts = country_counts.groupby('iso3').agg(
+        country=('country', 'first'), attacks=('attacks', 'sum')).reset_index()
 
     fig = px.choropleth(
-        country_counts, locations='country', locationmode='country names',
-        color='attacks', color_continuous_scale='Blues',
+        country_counts, locations='iso3', locationmode='ISO-3',
+        color='attacks', color_continuous_scale='Blues', hover_name='country',
         title='Attacks by Country'
     )
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                       geo=dict(showframe=False, bgcolor='rgba(0,0,0,0)', landcolor='#1e293b'), height=500)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='map_choropleth')
 
     col1, col2 = st.columns(2)
     with col1:
-        top_countries = df_filtered.groupby('country').agg({'nkill': 'sum', 'year': 'count'}).reset_index()
-        top_countries.columns = ['country', 'killed', 'attacks']
-        top_countries = top_countries.nlargest(15, 'attacks')
+        top_countries = df_filtered.groupby('country', observed=True).agg(
+            killed=('nkill', 'sum'), attacks=('nkill', 'size')).reset_index()
+        top_countries = top_n(top_countries, 'attacks', 15)
 
         fig = px.bar(top_countries, x='attacks', y='country', orientation='h',
                      color='killed', color_continuous_scale='Blues',
                      title='Top 15 Countries by Attacks')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                           plot_bgcolor='rgba(0,0,0,0)', yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='map_top_countries')
 
     with col2:
-        region_stats = df_filtered.groupby('region').agg({'nkill': 'sum', 'year': 'count'}).reset_index()
-        region_stats.columns = ['region', 'killed', 'attacks']
+        region_stats = df_filtered.groupby('region', observed=True).agg(
+            killed=('nkill', 'sum'), attacks=('nkill', 'size')).reset_index()
 
         fig = px.sunburst(region_stats, path=['region'], values='attacks', color='killed',
                           color_continuous_scale='Blues', title='Regional Distribution')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='map_regions')
 
 # =============================================
 # TAB 3: ATTACKS
 # =============================================
-with tab3:
+@st.fragment
+def render_attacks(df_filtered):
     col1, col2 = st.columns(2)
 
     with col1:
-        attack_counts = df_filtered['attack_type'].value_counts().reset_index()
-        attack_counts.columns = ['attack_type', 'count']
+        attack_counts = df_filtered.groupby('attack_type', observed=True).size().reset_index(name='count')
 
         fig = px.pie(attack_counts, values='count', names='attack_type',
                      title='Attack Type Distribution', hole=0.4,
                      color_discrete_sequence=px.colors.qualitative.Safe)
         fig.update_traces(textposition='inside', textinfo='percent+label')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='attacks_types')
 
     with col2:
         if 'target_type' in df_filtered.columns:
-            target_counts = df_filtered['target_type'].value_counts().head(10).reset_index()
-            target_counts.columns = ['target_type', 'count']
+            target_counts = df_filtered.groupby('target_type', observed=True).size().nlargest(10).reset_index(name='count')
 
             fig = px.bar(target_counts, x='count', y='target_type', orientation='h',
                          title='Top 10 Target Types', color='count', color_continuous_scale='Teal')
             fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                               plot_bgcolor='rgba(0,0,0,0)', yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key='attacks_targets')
 
-    attack_eff = df_filtered.groupby('attack_type').agg({
-        'success': 'mean', 'nkill': 'mean', 'year': 'count'
-    }).reset_index()
-    attack_eff.columns = ['attack_type', 'success_rate', 'avg_killed', 'total_attacks']
+    attack_eff = df_filtered.groupby('attack_type', observed=True).agg(
+        success_rate=('success', 'mean'), avg_killed=('nkill', 'mean'), total_attacks=('nkill', 'size')
+    ).reset_index()
     attack_eff['success_rate'] = attack_eff['success_rate'] * 100
 
     fig = px.scatter(attack_eff, x='success_rate', y='avg_killed', size='total_attacks',
                      color='attack_type', title='Success Rate vs Lethality (Size = Total Attacks)',
                      color_discrete_sequence=px.colors.qualitative.Safe)
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='attacks_efficiency')
 
     fig = px.box(df_filtered[df_filtered['nkill'] <= df_filtered['nkill'].quantile(0.95)],
                  x='attack_type', y='nkill', color='attack_type',
@@ -385,96 +495,122 @@ with tab3:
                  color_discrete_sequence=px.colors.qualitative.Safe)
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                       plot_bgcolor='rgba(0,0,0,0)', showlegend=False, xaxis_tickangle=-45)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='attacks_casualties')
 
 # =============================================
 # TAB 4: GROUPS
 # =============================================
-with tab4:
-    df_groups = df_filtered[df_filtered['group_name'] != 'Unknown']
-
-    top_groups = df_groups.groupby('group_name').agg({
-        'nkill': 'sum', 'nwound': 'sum', 'year': ['count', 'min', 'max']
-    }).reset_index()
-    top_groups.columns = ['group_name', 'killed', 'wounded', 'attacks', 'first_year', 'last_year']
+@st.cache_data
+def year_group_pivot(_df):
+    return _df.groupby(['year', 'group_name'], observed=True).size().unstack(fill_value=0).astype('int32')
+
+@st.cache_data(max_entries=32)
+def group_stats(_df_filtered, year_range, region, country, attack, success):
+    top_groups = _df_filtered.groupby('group_name', observed=True).agg(
+        killed=('nkill', 'sum'), wounded=('nwound', 'sum'), attacks=('nkill', 'size'),
+        first_year=('year', 'min'), last_year=('year', 'max')
+    ).drop('Unknown', errors='ignore').reset_index()
     top_groups['years_active'] = top_groups['last_year'] - top_groups['first_year'] + 1
+    return top_groups
+
+@st.fragment
+def render_groups(df_filtered):
+    top_groups = group_stats(df_filtered, year_range, selected_region, selected_country,
+                             selected_attack, success_filter)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        top15_attacks = top_groups.nlargest(15, 'attacks')
+        top15_attacks = top_n(top_groups, 'attacks', 15)
         fig = px.bar(top15_attacks, x='attacks', y='group_name', orientation='h',
                      color='killed', color_continuous_scale='Blues',
                      title='Top 15 Most Active Groups')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                           plot_bgcolor='rgba(0,0,0,0)', yaxis={'categoryorder': 'total ascending'}, height=500)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='groups_active')
 
     with col2:
-        top15_deadly = top_groups.nlargest(15, 'killed')
+        top15_deadly = top_n(top_groups, 'killed', 15)
         fig = px.bar(top15_deadly, x='killed', y='group_name', orientation='h',
                      color='attacks', color_continuous_scale='Teal',
                      title='Top 15 Deadliest Groups')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
                           plot_bgcolor='rgba(0,0,0,0)', yaxis={'categoryorder': 'total ascending'}, height=500)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='groups_deadly')
 
-    top5 = top_groups.nlargest(5, 'attacks')['group_name'].tolist()
-    group_timeline = df_groups[df_groups['group_name'].isin(top5)].groupby(['year', 'group_name']).size().reset_index(name='attacks')
+    top5 = top_n(top_groups, 'attacks', 5)['group_name'].tolist()
+    if (selected_region, selected_country, selected_attack, success_filter) == ('All Regions', 'All Countries', 'All Types', 'All'):
+        pivot = year_group_pivot(df).loc[year_range[0]:year_range[1]]
+    else:
+        pivot = df_filtered.groupby(['year', 'group_name'], observed=True).size().unstack(fill_value=0)
+    group_timeline = pivot[top5].reset_index().melt('year', var_name='group_name', value_name='attacks')
 
     fig = px.line(group_timeline, x='year', y='attacks', color='group_name',
                   title='Top 5 Groups Activity Timeline', markers=True,
                   color_discrete_sequence=px.colors.qualitative.Safe)
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='groups_timeline')
 
     if len(top_groups) > 0:
-        top20 = top_groups.nlargest(20, 'attacks')
+        top20 = top_n(top_groups, 'attacks', 20)
         fig = px.treemap(top20, path=['group_name'], values='attacks', color='killed',
                          color_continuous_scale='Blues', title='Group Comparison (Size=Attacks, Color=Killed)')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='groups_treemap')
 
 # =============================================
 # TAB 5: INSIGHTS
 # =============================================
-with tab5:
+@st.cache_data(max_entries=32)
+def region_attack_matrix(_df_filtered, year_range, region, country, attack, success):
+    return _df_filtered.groupby(['region', 'attack_type'], observed=True).size().unstack(fill_value=0)
+
+@st.fragment
+def render_insights(df_filtered):
+    yearly = yearly_totals(yearly_cube(df), year_range, selected_region, selected_country,
+                           selected_attack, success_filter)
+
     st.markdown("### Region x Attack Type Heatmap")
-    heatmap_data = pd.crosstab(df_filtered['region'], df_filtered['attack_type'])
+    heatmap_data = region_attack_matrix(df_filtered, year_range, selected_region, selected_country,
+                                        selected_attack, success_filter)
 
     fig = px.imshow(heatmap_data, title='Attack Frequency Matrix',
                     color_continuous_scale='Blues', aspect='auto')
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', height=500)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='insights_heatmap')
 
     col1, col2 = st.columns(2)
 
     with col1:
-        success_region = df_filtered.groupby('region')['success'].mean().reset_index()
+        success_region = df_filtered.groupby('region', observed=True)['success'].mean().reset_index()
         success_region['success'] = success_region['success'] * 100
         success_region = success_region.sort_values('success', ascending=True)
 
         fig = px.bar(success_region, x='success', y='region', orientation='h',
                      title='Success Rate by Region', color='success', color_continuous_scale='Teal')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='insights_success')
 
     with col2:
-        lethality = df_filtered.groupby('region')['nkill'].mean().reset_index()
+        lethality = df_filtered.groupby('region', observed=True)['nkill'].mean().reset_index()
         lethality = lethality.sort_values('nkill', ascending=True)
 
         fig = px.bar(lethality, x='nkill', y='region', orientation='h',
                      title='Avg Fatalities per Attack by Region', color='nkill', color_continuous_scale='Blues')
         fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key='insights_lethality')
 
     st.markdown("### Correlation Analysis")
     corr_cols = ['nkill', 'nwound', 'success', 'year']
-    corr_data = df_filtered[corr_cols].corr()
+    corr_block = np.column_stack([df_filtered[c].to_numpy(dtype=np.float32) for c in corr_cols])
+    corr_block = corr_block[~np.isnan(corr_block).any(axis=1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr_data = np.corrcoef(corr_block, rowvar=False)
 
-    fig = px.imshow(corr_data, title='Variable Correlations', color_continuous_scale='RdBu', text_auto='.2f')
+    fig = px.imshow(corr_data, x=corr_cols, y=corr_cols, title='Variable Correlations',
+                    color_continuous_scale='RdBu', text_auto='.2f')
     fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key='insights_corr')
     
     st.markdown("### Summary Statistics")
     col1, col2, col3 = st.columns(3)
@@ -501,14 +637,34 @@ with tab5:
 # =============================================
 # TAB 6: DATA
 # =============================================
-with tab6:
+# The export carries every GTD column, not just the ones the charts load.
+@st.cache_resource
+def load_full_table():
+    return pq.read_table('gtd_cleaned.parquet')
+
+def full_rows(df_filtered):
+    return load_full_table().take(pa.array(df_filtered.index.to_numpy()))
+
+# Each entry is a full-record CSV (tens of MB unfiltered), so only keep a couple of them.
+@st.cache_data(max_entries=2, ttl='10m')
+def filtered_csv(_df_filtered, year_range, region, country, attack, success):
+    buf = io.BytesIO()
+    pa_csv.write_csv(full_rows(_df_filtered), buf)
+    return buf.getvalue()
+
+@st.cache_data(max_entries=32)
+def filtered_summary(_df_filtered, year_range, region, country, attack, success):
+    return full_rows(_df_filtered).to_pandas().describe().to_csv()
+
+@st.fragment
+def render_data(df_filtered):
     st.markdown("###  Filtered Data Explorer")
     
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Rows", f"{len(df_filtered):,}")
     with col2:
-        st.metric("Columns", f"{len(df_filtered.columns)}")
+        st.metric("Columns", f"{load_full_table().num_columns}")
     with col3:
         st.metric("% of Total", f"{len(df_filtered)/len(df)*100:.1f}%")
     
@@ -524,21 +680,30 @@ with tab6:
     
     col1, col2 = st.columns(2)
     with col1:
-        csv = df_filtered.to_csv(index=False)
+        # Passing callables defers building the files until the button is clicked.
         st.download_button(
             label=" Download Filtered Data (CSV)",
-            data=csv,
+            data=functools.partial(filtered_csv, df_filtered, year_range, selected_region,
+                                   selected_country, selected_attack, success_filter),
             file_name='terrorism_filtered_data.csv',
             mime='text/csv'
         )
     with col2:
         st.download_button(
             label=" Download Summary Stats",
-            data=df_filtered.describe().to_csv(),
+            data=functools.partial(filtered_summary, df_filtered, year_range, selected_region,
+                                   selected_country, selected_attack, success_filter),
             file_name='terrorism_summary_stats.csv',
             mime='text/csv'
         )
 
+# =============================================
+# RENDER SELECTED TAB
+# =============================================
+TAB_RENDERERS = dict(zip(TAB_NAMES, [render_trends, render_map, render_attacks,
+                                     render_groups, render_insights, render_data]))
+TAB_RENDERERS[active_tab](df_filtered)
+
 # =============================================
 # FOOTER
 # =============================================